@@ -10,6 +10,7 @@ Endpoints:
   GET  /history            — user's interview history
   GET  /history/<id>       — single interview record
   GET  /analytics          — rich performance analytics
+  GET  /analytics/global   — cohort percentiles, calibration, leaderboard
 """
 
 from flask import Flask, request, jsonify
@@ -24,7 +25,7 @@ from helpers import (
     get_users, save_users, find_user_by_username,
     get_questions_filtered, get_question_by_id, get_available_roles, get_question_stats,
     save_interview, get_user_interviews, get_user_interview_by_id,
-    evaluate_answer, compute_analytics,
+    evaluate_answer, compute_analytics, compute_global_analytics, DIFFICULTIES,
 )
 
 app = Flask(__name__)
@@ -150,7 +151,6 @@ def submit():
 
     data = request.get_json() or {}
     user_id = payload["sub"]
-    role = data.get("role")
     difficulty = data.get("difficulty", "medium")
     question_id = data.get("question_id")
     answer = data.get("answer", "")
@@ -159,13 +159,19 @@ def submit():
     if not question:
         return jsonify({"error": "question not found"}), 400
 
+    # The role always comes from the question and an unknown difficulty
+    # falls back to the question's, so client input can't create or
+    # distort analytics cohorts.
+    if difficulty not in DIFFICULTIES:
+        difficulty = question.get("difficulty", "medium")
+
     result = evaluate_answer(answer, question, difficulty)
 
     record = {
         "id": str(uuid.uuid4()),
         "user_id": user_id,
         "date": datetime.datetime.now(timezone.utc).isoformat(),
-        "role": role or question.get("role"),
+        "role": question.get("role"),
         "difficulty": difficulty,
         "category": question.get("category", ""),
         "question_id": question_id,
@@ -215,6 +221,16 @@ def analytics():
     return jsonify(data)
 
 
+@app.route("/analytics/global", methods=["GET"])
+def analytics_global():
+    payload = _get_current_user()
+    if not payload:
+        return jsonify({"error": "unauthorized"}), 401
+    limit = request.args.get("limit", 10, type=int)
+    data = compute_global_analytics(limit=max(1, min(limit, 100)))
+    return jsonify(data)
+
+
 # ── Health check (keep-alive for Render free tier) ───────────
 
 @app.route("/health", methods=["GET"])
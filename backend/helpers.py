@@ -6,6 +6,7 @@ an fcntl advisory lock so concurrent Flask workers don't corrupt data.
 """
 
 import json
+import logging
 import os
 import re
 from collections import Counter
@@ -23,6 +24,8 @@ except ImportError:
     def _lock_ex(fh): pass
     def _unlock(fh):  pass
 
+log = logging.getLogger(__name__)
+
 # ── paths ────────────────────────────────────────────────────
 
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -30,6 +33,7 @@ DB_FILES = {
     "users":      os.path.join(DATA_DIR, "users.json"),
     "interviews": os.path.join(DATA_DIR, "interviews.json"),
     "questions":  os.path.join(DATA_DIR, "questions.json"),
+    "stats":      os.path.join(DATA_DIR, "stats.json"),
 }
 
 # ── low-level JSON I/O (with file-locking) ───────────────────
@@ -59,11 +63,14 @@ def _save(name, data):
         _unlock(fh)
 
 def _append(name, record):
-    """Append a single record to a JSON list file (atomic read-modify-write)."""
+    """Append a single record to a JSON list file (atomic read-modify-write).
+
+    Returns the new length of the list.
+    """
     path = DB_FILES[name]
     if not os.path.exists(path):
         _save(name, [record])
-        return
+        return 1
     with open(path, "r+", encoding="utf-8") as fh:
         _lock_ex(fh)
         try:
@@ -76,6 +83,7 @@ def _append(name, record):
         json.dump(data, fh, indent=2, ensure_ascii=False)
         fh.flush()
         _unlock(fh)
+    return len(data)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -143,7 +151,13 @@ def get_interviews():
     return _load("interviews")
 
 def save_interview(record):
-    _append("interviews", record)
+    position = _append("interviews", record)
+    try:
+        record_interview_stats(record, position)
+    except Exception:
+        # The interview is already stored — don't fail the submission,
+        # but make the broken stats update visible.
+        log.exception("stats update failed for interview %s", record.get("id"))
 
 def get_user_interviews(user_id):
     """All interviews for a given user, newest-first."""
@@ -160,6 +174,320 @@ def get_user_interview_by_id(user_id, interview_id):
     return None
 
 
+# ═══════════════════════════════════════════════════════════════
+# GLOBAL STATS (incremental aggregates)
+# ═══════════════════════════════════════════════════════════════
+#
+# stats.json holds running aggregates that save_interview() updates
+# one record at a time, so cohort analytics never rescan interviews.json.
+# Scores are integers in 0–100, so each cohort's quantile sketch is a
+# fixed 101-bin histogram: exact, constant-size, and mergeable.
+#
+# Two kinds of numbers come out of it:
+#   • cohort summaries (quantiles, means) describe individual attempts;
+#   • percentile ranks place a user's *average* among the averages of
+#     every other user in the same cohort.  A second set of histograms
+#     ("user_averages") holds one entry per user, moved between bins
+#     as that user's average changes.
+#
+# "total" is the number of interviews folded in and "recent_ids" the
+# ids of the last few.  save_interview() knows the position of the
+# record it just appended; anything other than "already folded" or
+# "exactly the next one" means the aggregates drifted and are rebuilt.
+
+STATS_VERSION = 2
+SCORE_BINS = 101
+RECENT_IDS = 50
+DIFFICULTIES = ("easy", "medium", "hard")
+LEADERBOARD_MIN_INTERVIEWS = 3
+
+def interview_labels(record):
+    """Normalized (role, difficulty) used to group an interview everywhere."""
+    role = record.get("role") or "unknown"
+    difficulty = record.get("difficulty")
+    if difficulty not in DIFFICULTIES:
+        difficulty = "medium"
+    return role, difficulty
+
+def _empty_stats():
+    return {
+        "version": STATS_VERSION,
+        "total": 0,
+        "recent_ids": [],
+        "global": [0] * SCORE_BINS,
+        "by_role": {},
+        "by_difficulty": {},
+        "by_role_difficulty": {},
+        "questions": {},
+        "users": {},
+        "user_averages": {"overall": [0] * SCORE_BINS, "by_role": {}, "by_difficulty": {}},
+    }
+
+def _valid_stats(stats):
+    return isinstance(stats, dict) and stats.get("version") == STATS_VERSION
+
+def _score_bin(score):
+    try:
+        return max(0, min(SCORE_BINS - 1, int(round(score or 0))))
+    except (TypeError, ValueError):
+        return 0
+
+def _cohort_key(role, difficulty):
+    return f"{role}/{difficulty}"
+
+def _move_average(hist, count, total, score):
+    """Shift one user's average in `hist` to account for a new score."""
+    if count:
+        hist[_score_bin(total / count)] -= 1
+    hist[_score_bin((total + score) / (count + 1))] += 1
+
+def _apply_record(stats, record):
+    """Fold a single interview record into the aggregates (in place)."""
+    score = _score_bin(record.get("score", 0))
+    role, difficulty = interview_labels(record)
+
+    stats["total"] += 1
+    stats["recent_ids"] = (stats["recent_ids"] + [record.get("id")])[-RECENT_IDS:]
+    stats["global"][score] += 1
+    for bucket, key in (
+        ("by_role", role),
+        ("by_difficulty", difficulty),
+        ("by_role_difficulty", _cohort_key(role, difficulty)),
+    ):
+        stats[bucket].setdefault(key, [0] * SCORE_BINS)[score] += 1
+
+    # per question, split by the difficulty the attempt was scored at
+    # (evaluate_answer's multiplier depends on it)
+    qid = record.get("question_id")
+    if qid:
+        q = stats["questions"].setdefault(qid, {}).setdefault(
+            difficulty, {"count": 0, "total": 0, "zeros": 0}
+        )
+        q["count"] += 1
+        q["total"] += score
+        if score == 0:
+            q["zeros"] += 1
+
+    uid = record.get("user_id")
+    if uid:
+        averages = stats["user_averages"]
+        u = stats["users"].setdefault(uid, {
+            "count": 0, "total": 0, "best": 0, "by_role": {}, "by_difficulty": {},
+        })
+        _move_average(averages["overall"], u["count"], u["total"], score)
+        u["count"] += 1
+        u["total"] += score
+        u["best"] = max(u["best"], score)
+        for bucket, key in (("by_role", role), ("by_difficulty", difficulty)):
+            c = u[bucket].setdefault(key, [0, 0])
+            hist = averages[bucket].setdefault(key, [0] * SCORE_BINS)
+            _move_average(hist, c[0], c[1], score)
+            c[0] += 1
+            c[1] += score
+
+def _build_stats():
+    stats = _empty_stats()
+    for record in get_interviews():
+        _apply_record(stats, record)
+    return stats
+
+def _write_stats(fh, stats):
+    fh.seek(0)
+    fh.truncate()
+    json.dump(stats, fh, separators=(",", ":"), ensure_ascii=False)
+    fh.flush()
+
+def _open_stats():
+    """Open stats.json for read-modify-write, creating it if needed."""
+    path = DB_FILES["stats"]
+    if not os.path.exists(path):
+        open(path, "a", encoding="utf-8").close()
+    return open(path, "r+", encoding="utf-8")
+
+def _read_stats(fh):
+    fh.seek(0)
+    try:
+        stats = json.load(fh)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    return stats if _valid_stats(stats) else None
+
+def rebuild_stats():
+    """Recompute stats.json from interviews.json (one full scan).
+
+    The scan runs under the stats.json exclusive lock so a concurrent
+    record_interview_stats() sees the rebuilt totals, not a stale file.
+    """
+    with _open_stats() as fh:
+        _lock_ex(fh)
+        try:
+            stats = _build_stats()
+            _write_stats(fh, stats)
+        finally:
+            _unlock(fh)
+    return stats
+
+def get_stats():
+    """Load the global aggregates, bootstrapping them on first use."""
+    stats = _load("stats")
+    if not _valid_stats(stats):
+        stats = rebuild_stats()
+    return stats
+
+def record_interview_stats(record, position):
+    """Fold the interview stored at 1-based `position` into stats.json.
+
+    Already folded (a concurrent rebuild picked it up) → no-op.  Exactly
+    the next one → incremental update.  Anything else, including
+    interviews.json having shrunk, → full rebuild.
+    """
+    with _open_stats() as fh:
+        _lock_ex(fh)
+        try:
+            stats = _read_stats(fh)
+            if (stats is not None and stats["total"] >= position
+                    and record.get("id") in stats["recent_ids"]):
+                return
+            if stats is not None and stats["total"] == position - 1:
+                _apply_record(stats, record)
+            else:
+                stats = _build_stats()
+            _write_stats(fh, stats)
+        finally:
+            _unlock(fh)
+
+def _hist_count(hist):
+    return sum(hist)
+
+def _hist_mean(hist):
+    n = _hist_count(hist)
+    if not n:
+        return 0
+    return sum(score * c for score, c in enumerate(hist)) / n
+
+def _hist_quantile(hist, q):
+    """Smallest score s such that at least q of the mass is <= s."""
+    n = _hist_count(hist)
+    if not n:
+        return 0
+    target = q * n
+    running = 0
+    for score, c in enumerate(hist):
+        running += c
+        if running >= target and running > 0:
+            return score
+    return SCORE_BINS - 1
+
+def _hist_percentile_rank(hist, score, exclude=0):
+    """Percent of the histogram's mass below `score` (ties count half).
+
+    `exclude` entries are first removed from `score`'s own bin, so a
+    member can be ranked against everyone else.
+    """
+    n = _hist_count(hist) - exclude
+    if n <= 0:
+        return None
+    s = _score_bin(score)
+    below = sum(hist[:s])
+    return round(100 * (below + 0.5 * (hist[s] - exclude)) / n, 1)
+
+def _hist_summary(hist):
+    return {
+        "count": _hist_count(hist),
+        "mean": round(_hist_mean(hist), 1),
+        "p25": _hist_quantile(hist, 0.25),
+        "p50": _hist_quantile(hist, 0.50),
+        "p75": _hist_quantile(hist, 0.75),
+        "p90": _hist_quantile(hist, 0.90),
+    }
+
+def _calibrated_difficulty(mean_score):
+    """Map an observed mean score onto the easy/medium/hard scale."""
+    if mean_score >= 70:
+        return "easy"
+    if mean_score >= 45:
+        return "medium"
+    return "hard"
+
+def _question_calibration(qstats, question):
+    """Calibration from attempts made at the question's labeled difficulty."""
+    labeled = question.get("difficulty")
+    at_label = qstats.get(labeled, {})
+    count = at_label.get("count", 0)
+    mean = at_label.get("total", 0) / count if count else 0
+    return {
+        "role": question.get("role"),
+        "labeled_difficulty": labeled,
+        "attempts": count,
+        "mean_score": round(mean, 1),
+        "zero_rate": round(at_label.get("zeros", 0) / count, 2) if count else 0,
+        "calibrated_difficulty": _calibrated_difficulty(mean) if count else None,
+    }
+
+def _user_percentile_ranks(stats, user_id):
+    """Rank a user's averages among other users' averages, per cohort.
+
+    None when the cohort has no other users.
+    """
+    me = stats["users"].get(user_id)
+    if not me:
+        return {"overall": None, "by_role": {}, "by_difficulty": {}}
+
+    averages = stats["user_averages"]
+    ranks = {
+        "overall": _hist_percentile_rank(
+            averages["overall"], me["total"] / me["count"], exclude=1
+        ),
+    }
+    for bucket in ("by_role", "by_difficulty"):
+        ranks[bucket] = {
+            key: _hist_percentile_rank(averages[bucket][key], total / count, exclude=1)
+            for key, (count, total) in me[bucket].items()
+        }
+    return ranks
+
+def compute_global_analytics(limit=10):
+    """Cohort-level analytics built purely from the incremental aggregates."""
+    stats = get_stats()
+    questions = {q.get("id"): q for q in get_questions()}
+
+    calibration = {
+        qid: _question_calibration(qs, questions[qid])
+        for qid, qs in stats["questions"].items() if qid in questions
+    }
+
+    usernames = {u.get("id"): u.get("username") for u in get_users()}
+    ranked = sorted(
+        (
+            (uid, u) for uid, u in stats["users"].items()
+            if u.get("count", 0) >= LEADERBOARD_MIN_INTERVIEWS
+        ),
+        key=lambda item: (item[1]["total"] / item[1]["count"], item[1]["count"]),
+        reverse=True,
+    )
+    leaderboard = [
+        {
+            "rank": pos,
+            "username": usernames.get(uid, "anonymous"),
+            "avg_score": int(u["total"] / u["count"]),
+            "best_score": u.get("best", 0),
+            "interviews": u["count"],
+        }
+        for pos, (uid, u) in enumerate(ranked[:limit], start=1)
+    ]
+
+    return {
+        "total_interviews": stats["total"],
+        "total_users": len(stats["users"]),
+        "overall": _hist_summary(stats["global"]),
+        "by_role": {r: _hist_summary(h) for r, h in stats["by_role"].items()},
+        "by_difficulty": {d: _hist_summary(h) for d, h in stats["by_difficulty"].items()},
+        "by_role_difficulty": {k: _hist_summary(h) for k, h in stats["by_role_difficulty"].items()},
+        "question_calibration": calibration,
+        "leaderboard": leaderboard,
+    }
+
+
 # ═══════════════════════════════════════════════════════════════
 # ANALYTICS HELPERS
 # ═══════════════════════════════════════════════════════════════
@@ -180,6 +508,8 @@ def compute_analytics(user_id):
             "improvement_suggestions": [
                 "Complete your first interview to start tracking progress."
             ],
+            "percentile_ranks": {"overall": None, "by_role": {}, "by_difficulty": {}},
+            "question_calibration": {},
         }
 
     # -- timeseries (oldest → newest for charting) --
@@ -196,13 +526,13 @@ def compute_analytics(user_id):
     # per-role
     roles = {}
     for i in interviews:
-        roles.setdefault(i.get("role", "unknown"), []).append(i.get("score", 0))
+        roles.setdefault(interview_labels(i)[0], []).append(i.get("score", 0))
     role_avg = {r: int(sum(s) / len(s)) for r, s in roles.items()}
 
     # per-difficulty
     diffs = {}
     for i in interviews:
-        diffs.setdefault(i.get("difficulty", "medium"), []).append(i.get("score", 0))
+        diffs.setdefault(interview_labels(i)[1], []).append(i.get("score", 0))
     diff_avg = {d: int(sum(s) / len(s)) for d, s in diffs.items()}
 
     # -- strength / weakness frequency --
@@ -244,6 +574,22 @@ def compute_analytics(user_id):
     if not suggestions:
         suggestions.append("You're doing well! Try harder questions or new roles to keep improving.")
 
+    # -- percentile ranks vs. everyone (from incremental aggregates) --
+    stats = get_stats()
+    percentile_ranks = _user_percentile_ranks(stats, user_id)
+
+    # -- difficulty calibration for the questions this user attempted --
+    questions = {q.get("id"): q for q in get_questions()}
+    own_scores = {}
+    for i in interviews:
+        if i.get("question_id") in questions:
+            own_scores.setdefault(i["question_id"], []).append(i.get("score", 0))
+    question_calibration = {}
+    for qid, s in own_scores.items():
+        entry = _question_calibration(stats["questions"].get(qid, {}), questions[qid])
+        entry["your_avg"] = int(sum(s) / len(s))
+        question_calibration[qid] = entry
+
     return {
         "total_interviews": len(interviews),
         "avg_score": avg_score,
@@ -254,6 +600,8 @@ def compute_analytics(user_id):
         "weakness_frequency": dict(weak_counter.most_common(10)),
         "recent_trend": recent_trend,
         "improvement_suggestions": suggestions,
+        "percentile_ranks": percentile_ranks,
+        "question_calibration": question_calibration,
     }
 
 
@@ -0,0 +1,78 @@
+"""
+test_app.py — checks for the analytics and submit routes
+=========================================================
+Run from backend/:  python -m pytest -q
+"""
+
+import unittest
+
+import helpers
+from app import app, _create_token
+from test_helpers import TempDataMixin
+
+
+class RouteTestCase(TempDataMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = app.test_client()
+        self.auth = {"Authorization": "Bearer " + _create_token("u-test", "tester")}
+
+
+class GlobalAnalyticsRouteTests(RouteTestCase):
+    def test_requires_auth(self):
+        self.assertEqual(self.client.get("/analytics/global").status_code, 401)
+
+    def test_limit_is_clamped(self):
+        helpers._save("interviews", [])
+        for n in range(3):
+            for uid in ("u1", "u2"):
+                helpers.save_interview(self._record(uid, 50 + n))
+
+        res = self.client.get("/analytics/global?limit=0", headers=self.auth)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.get_json()["leaderboard"]), 1)
+
+        res = self.client.get("/analytics/global?limit=-5", headers=self.auth)
+        self.assertEqual(len(res.get_json()["leaderboard"]), 1)
+
+        res = self.client.get("/analytics/global?limit=1000", headers=self.auth)
+        self.assertEqual(len(res.get_json()["leaderboard"]), 2)
+
+    def test_payload_shape(self):
+        data = self.client.get("/analytics/global", headers=self.auth).get_json()
+        for key in ("total_interviews", "total_users", "overall", "by_role",
+                    "by_difficulty", "by_role_difficulty", "question_calibration",
+                    "leaderboard"):
+            self.assertIn(key, data)
+
+
+class SubmitLabelTests(RouteTestCase):
+    def _submit(self, **body):
+        body.setdefault("question_id", "q-fe-e1")
+        body.setdefault("answer", "Margin is outside the border, padding is inside it.")
+        res = self.client.post("/submit", json=body, headers=self.auth)
+        self.assertEqual(res.status_code, 200)
+        return res.get_json()["record"]
+
+    def test_role_always_comes_from_question(self):
+        record = self._submit(role="backend")
+        self.assertEqual(record["role"], "frontend")
+        self.assertNotIn("backend", helpers.get_stats()["by_role"])
+
+    def test_made_up_role_does_not_create_a_cohort(self):
+        self._submit(role="x" * 500)
+        self.assertEqual(set(helpers.get_stats()["by_role"]) - set(helpers.get_available_roles()),
+                         set())
+
+    def test_unknown_difficulty_falls_back_to_question(self):
+        record = self._submit(difficulty="impossible")
+        self.assertEqual(record["difficulty"], "easy")
+        self.assertNotIn("impossible", helpers.get_stats()["by_difficulty"])
+
+    def test_valid_difficulty_is_kept(self):
+        record = self._submit(difficulty="hard")
+        self.assertEqual(record["difficulty"], "hard")
+
+
+if __name__ == "__main__":
+    unittest.main()
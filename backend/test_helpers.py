@@ -0,0 +1,257 @@
+"""
+test_helpers.py — checks for the global stats aggregates
+=========================================================
+Run from backend/:  python -m pytest -q
+Each test points helpers at a scratch copy of the JSON data files.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import helpers
+
+
+class TempDataMixin:
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self._orig_files = dict(helpers.DB_FILES)
+        for name in ("users", "interviews", "questions"):
+            dst = os.path.join(self.tmp, f"{name}.json")
+            shutil.copy(self._orig_files[name], dst)
+            helpers.DB_FILES[name] = dst
+        helpers.DB_FILES["stats"] = os.path.join(self.tmp, "stats.json")
+
+    def tearDown(self):
+        helpers.DB_FILES.clear()
+        helpers.DB_FILES.update(self._orig_files)
+        shutil.rmtree(self.tmp)
+
+    def _record(self, user_id, score, role="frontend", difficulty="easy", qid="q-fe-e1"):
+        return {
+            "id": f"{user_id}-{score}-{len(helpers.get_interviews())}",
+            "user_id": user_id,
+            "role": role,
+            "difficulty": difficulty,
+            "question_id": qid,
+            "score": score,
+        }
+
+
+class HistogramTests(unittest.TestCase):
+    def _hist(self, **counts):
+        hist = [0] * helpers.SCORE_BINS
+        for score, c in counts.items():
+            hist[int(score[1:])] = c
+        return hist
+
+    def test_empty_histogram(self):
+        empty = [0] * helpers.SCORE_BINS
+        self.assertEqual(helpers._hist_quantile(empty, 0.5), 0)
+        self.assertIsNone(helpers._hist_percentile_rank(empty, 50))
+        self.assertEqual(helpers._hist_summary(empty)["count"], 0)
+
+    def test_single_bin(self):
+        hist = self._hist(s42=5)
+        for q in (0.0, 0.25, 0.5, 1.0):
+            self.assertEqual(helpers._hist_quantile(hist, q), 42)
+        self.assertEqual(helpers._hist_percentile_rank(hist, 42), 50.0)
+        self.assertEqual(helpers._hist_percentile_rank(hist, 0), 0.0)
+        self.assertEqual(helpers._hist_percentile_rank(hist, 100), 100.0)
+
+    def test_ties_count_half(self):
+        hist = self._hist(s0=1, s56=1, s80=3)
+        self.assertEqual(helpers._hist_percentile_rank(hist, 80), 70.0)
+        self.assertEqual(helpers._hist_quantile(hist, 0.5), 80)
+        self.assertEqual(helpers._hist_quantile(hist, 0.2), 0)
+        self.assertEqual(helpers._hist_quantile(hist, 0.4), 56)
+
+    def test_out_of_range_scores_are_clamped(self):
+        hist = self._hist(s100=1)
+        self.assertEqual(helpers._hist_percentile_rank(hist, 150), 50.0)
+        self.assertEqual(helpers._hist_percentile_rank(hist, -5), 0.0)
+
+    def test_exclude_removes_self_from_own_bin(self):
+        hist = self._hist(s10=1, s20=2, s30=1)
+        self.assertEqual(helpers._hist_percentile_rank(hist, 20, exclude=1), 50.0)
+        self.assertEqual(helpers._hist_percentile_rank(hist, 30, exclude=1), 100.0)
+        self.assertIsNone(helpers._hist_percentile_rank(self._hist(s50=1), 50, exclude=1))
+
+
+class StatsConsistencyTests(TempDataMixin, unittest.TestCase):
+    def test_incremental_matches_rebuild(self):
+        for uid, score, diff in [("a", 80, "easy"), ("b", 0, "hard"), ("a", 55, "medium"),
+                                 ("c", 100, "easy"), ("b", 56, None)]:
+            helpers.save_interview(self._record(uid, score, difficulty=diff))
+        incremental = helpers.get_stats()
+        self.assertEqual(incremental["total"], len(helpers.get_interviews()))
+        self.assertEqual(incremental, helpers.rebuild_stats())
+
+    def test_stats_file_is_compact(self):
+        helpers.rebuild_stats()
+        with open(helpers.DB_FILES["stats"], encoding="utf-8") as fh:
+            rebuilt = fh.read()
+        self.assertNotIn("\n", rebuilt)
+        helpers.save_interview(self._record("a", 70))
+        with open(helpers.DB_FILES["stats"], encoding="utf-8") as fh:
+            self.assertNotIn("\n", fh.read())
+
+    def test_drift_is_repaired_on_next_save(self):
+        helpers.get_stats()
+        # simulate a save whose stats update never happened
+        helpers._append("interviews", self._record("a", 30))
+        helpers.save_interview(self._record("a", 90))
+        self.assertEqual(helpers.get_stats(), helpers.rebuild_stats())
+
+    def test_stats_failure_does_not_fail_the_save(self):
+        helpers.get_stats()
+        before = len(helpers.get_interviews())
+        original = helpers.record_interview_stats
+        def boom(record, position):
+            raise OSError("disk full")
+        helpers.record_interview_stats = boom
+        try:
+            helpers.save_interview(self._record("a", 10))
+        finally:
+            helpers.record_interview_stats = original
+        self.assertEqual(len(helpers.get_interviews()), before + 1)
+
+    def test_already_counted_record_is_not_applied_twice(self):
+        helpers.get_stats()
+        record = self._record("a", 40)
+        position = helpers._append("interviews", record)
+        helpers.rebuild_stats()  # a concurrent bootstrap picked it up
+        helpers.record_interview_stats(record, position)
+        self.assertEqual(helpers.get_stats()["total"], position)
+
+    def test_missing_labels_group_the_same_everywhere(self):
+        helpers._save("interviews", [])
+        helpers.save_interview(self._record("a", 60, role=None, difficulty=None))
+        analytics = helpers.compute_analytics("a")
+        self.assertEqual(list(analytics["role_average"]), ["unknown"])
+        self.assertEqual(list(analytics["difficulty_average"]), ["medium"])
+        self.assertEqual(analytics["percentile_ranks"]["by_role"], {"unknown": None})
+        self.assertEqual(analytics["percentile_ranks"]["by_difficulty"], {"medium": None})
+
+    def test_old_schema_is_rebuilt(self):
+        helpers._save("stats", {"total": 0, "global": [0] * helpers.SCORE_BINS})
+        stats = helpers.get_stats()
+        self.assertEqual(stats["version"], helpers.STATS_VERSION)
+        self.assertEqual(stats["total"], len(helpers.get_interviews()))
+
+    def test_old_schema_is_rebuilt_on_save(self):
+        helpers._save("stats", {"total": len(helpers.get_interviews()),
+                                "global": [0] * helpers.SCORE_BINS})
+        helpers.save_interview(self._record("a", 70))
+        self.assertEqual(helpers.get_stats(), helpers.rebuild_stats())
+
+    def test_corrupt_interviews_file_forces_rebuild(self):
+        helpers.save_interview(self._record("a", 30))
+        self.assertGreater(helpers.get_stats()["total"], 1)
+        with open(helpers.DB_FILES["interviews"], "w", encoding="utf-8") as fh:
+            fh.write("{not json")
+        helpers.save_interview(self._record("newcomer", 90))
+        stats = helpers.get_stats()
+        self.assertEqual(stats["total"], 1)
+        self.assertEqual(list(stats["users"]), ["newcomer"])
+        helpers.save_interview(self._record("newcomer", 50))
+        self.assertEqual(helpers.get_stats(), helpers.rebuild_stats())
+
+    def test_stats_failure_is_logged(self):
+        helpers.get_stats()
+        original = helpers._apply_record
+        def broken(stats, record):
+            raise KeyError("schema")
+        helpers._apply_record = broken
+        try:
+            with self.assertLogs(helpers.log, level="ERROR"):
+                helpers.save_interview(self._record("a", 10))
+        finally:
+            helpers._apply_record = original
+
+
+class PercentileRankTests(TempDataMixin, unittest.TestCase):
+    def test_ranks_share_one_definition(self):
+        helpers._save("interviews", [])
+        helpers.save_interview(self._record("low", 0))
+        helpers.save_interview(self._record("mid", 56))
+        for _ in range(3):
+            helpers.save_interview(self._record("me", 80))
+        ranks = helpers.compute_analytics("me")["percentile_ranks"]
+        self.assertEqual(ranks["overall"], ranks["by_role"]["frontend"])
+        self.assertEqual(ranks["overall"], ranks["by_difficulty"]["easy"])
+        self.assertEqual(ranks["overall"], 100.0)
+        self.assertEqual(helpers.compute_analytics("mid")["percentile_ranks"]["overall"], 50.0)
+
+    def test_user_average_moves_between_bins(self):
+        helpers._save("interviews", [])
+        helpers.save_interview(self._record("a", 20))
+        helpers.save_interview(self._record("b", 60))
+        self.assertEqual(helpers.compute_analytics("a")["percentile_ranks"]["overall"], 0.0)
+        helpers.save_interview(self._record("a", 100))  # a's average: 20 → 60
+        overall = helpers.get_stats()["user_averages"]["overall"]
+        self.assertEqual(overall[20], 0)
+        self.assertEqual(overall[60], 2)
+        self.assertEqual(helpers.compute_analytics("a")["percentile_ranks"]["overall"], 50.0)
+
+    def test_lone_user_has_no_rank(self):
+        helpers._save("interviews", [])
+        helpers.save_interview(self._record("solo", 70))
+        ranks = helpers.compute_analytics("solo")["percentile_ranks"]
+        self.assertIsNone(ranks["overall"])
+        self.assertEqual(ranks["by_role"], {"frontend": None})
+
+    def test_calibration_uses_labeled_difficulty_only(self):
+        helpers._save("interviews", [])
+        helpers.save_interview(self._record("a", 20, difficulty="easy"))
+        helpers.save_interview(self._record("a", 90, difficulty="hard"))
+        entry = helpers.compute_analytics("a")["question_calibration"]["q-fe-e1"]
+        self.assertEqual(entry["labeled_difficulty"], "easy")
+        self.assertEqual(entry["role"], "frontend")
+        self.assertEqual(entry["attempts"], 1)
+        self.assertEqual(entry["mean_score"], 20.0)
+        self.assertEqual(entry["your_avg"], 55)
+
+
+class GlobalAnalyticsTests(TempDataMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        helpers._save("interviews", [])
+        helpers.save_users([{"id": "u-top", "username": "top"},
+                            {"id": "u-mid", "username": "mid"}])
+        for uid, scores in [("u-top", [90, 90, 90]), ("u-mid", [60, 70, 80]),
+                            ("u-ghost", [50, 50, 50]), ("u-few", [100, 100])]:
+            for score in scores:
+                helpers.save_interview(self._record(uid, score))
+
+    def test_leaderboard_filters_orders_and_names(self):
+        board = helpers.compute_global_analytics()["leaderboard"]
+        self.assertEqual([e["username"] for e in board], ["top", "mid", "anonymous"])
+        self.assertEqual([e["rank"] for e in board], [1, 2, 3])
+        self.assertEqual(board[1], {"rank": 2, "username": "mid", "avg_score": 70,
+                                    "best_score": 80, "interviews": 3})
+
+    def test_leaderboard_limit(self):
+        board = helpers.compute_global_analytics(limit=1)["leaderboard"]
+        self.assertEqual([e["username"] for e in board], ["top"])
+
+    def test_summary_and_calibration(self):
+        data = helpers.compute_global_analytics()
+        self.assertEqual(data["total_interviews"], 11)
+        self.assertEqual(data["total_users"], 4)
+        self.assertEqual(data["overall"]["count"], 11)
+        self.assertEqual(set(data["by_role"]), {"frontend"})
+        cal = data["question_calibration"]["q-fe-e1"]
+        self.assertEqual(cal["attempts"], 11)
+        self.assertEqual(cal["labeled_difficulty"], "easy")
+        self.assertEqual(cal["calibrated_difficulty"], "easy")
+
+    def test_unknown_questions_are_left_out_of_calibration(self):
+        helpers.save_interview(self._record("u-top", 10, qid="q-gone"))
+        self.assertNotIn("q-gone", helpers.compute_global_analytics()["question_calibration"])
+
+
+if __name__ == "__main__":
+    unittest.main()